@@ -22,8 +22,54 @@
 g_ff_array module
 """
 
+from functools import lru_cache
+from string import Template
+
 from p2v import p2v, misc, clock, default_clk
 
+_TOP_TASKS = Template("""
+                    task automatic write;
+                        input [$addr_msb:0] addr;
+                        input [$data_msb:0] data;
+                        begin
+                            $inst_name.write(addr, data);
+                        end
+                    endtask
+
+                    task automatic read;
+                        input [$addr_msb:0] addr;
+                        output [$data_msb:0] data;
+                        begin
+                            $inst_name.read(addr, data);
+                        end
+                    endtask
+                    """)
+
+_RW_TASKS = Template("""
+                    task automatic write;
+                        input [$addr_msb:0] addr;
+                        input [$data_msb:0] data;
+                        begin
+                            $path[addr] = data;
+                        end
+                    endtask
+
+                    task automatic read;
+                        input [$addr_msb:0] addr;
+                        output [$data_msb:0] data;
+                        logic [$data_msb:0] data;
+                        begin
+                            data = $path[addr];
+                        end
+                    endtask
+                    """)
+
+
+@lru_cache(maxsize=None)
+def _top_tasks_text(inst_name, bits, addr_bits):
+    return _TOP_TASKS.substitute(addr_msb=addr_bits-1, data_msb=bits-1, inst_name=inst_name)
+
+
 class g_ff_array(p2v):
     """
     This class creates a ff implemented memory.
@@ -46,7 +92,8 @@ class g_ff_array(p2v):
         self.set_param(bits, int, bits > 0) # data width
         self.set_param(bit_sel, int, bit_sel in [0, 1], default=1) # use bit select
         self.set_param(sample, bool, default=True) # sample output
-        self.set_param(path, str, misc._is_legal_name(path.split(".")[0])) # instance path to enable mimic of other rtl
+        path_parts = path.split(".")
+        self.set_param(path, str, misc._is_legal_name(path_parts[0])) # instance path to enable mimic of other rtl
         self.set_modname()
 
         addr_bits = misc.log2(depth)
@@ -68,11 +115,9 @@ class g_ff_array(p2v):
         rd_data = self.output([bits])
 
 
-        if "." in path:
-            inst_name = path.split(".")[0]
-            path = path.replace(f"{inst_name}.", "", 1)
-
-            son = g_ff_array(self).module(wr_clk, rd_clk, depth=depth, bits=bits, sample=sample, path=path)
+        if len(path_parts) > 1: # empty hierarchy level, child must be elaborated from within this module
+            inst_name = path_parts[0]
+            son = g_ff_array(self).module(wr_clk, rd_clk, depth=depth, bits=bits, sample=sample, path=".".join(path_parts[1:]))
             son.connect_auto()
             son.inst(inst_name)
 
@@ -96,45 +141,12 @@ class g_ff_array(p2v):
 
     def _top_tasks(self, inst_name, bits, addr_bits):
         self.tb.syn_off()
-        self.line(f"""
-                    task automatic write;
-                        input [{addr_bits-1}:0] addr;
-                        input [{bits-1}:0] data;
-                        begin
-                            {inst_name}.write(addr, data);
-                        end
-                    endtask
-
-                    task automatic read;
-                        input [{addr_bits-1}:0] addr;
-                        output [{bits-1}:0] data;
-                        begin
-                            {inst_name}.read(addr, data);
-                        end
-                    endtask
-                    """)
+        self.line(_top_tasks_text(inst_name, bits, addr_bits))
         self.tb.syn_on()
 
     def _rw_tasks(self, path, bits, addr_bits):
         self.tb.syn_off()
-        self.line(f"""
-                    task automatic write;
-                        input [{addr_bits-1}:0] addr;
-                        input [{bits-1}:0] data;
-                        begin
-                            {path}[addr] = data;
-                        end
-                    endtask
-
-                    task automatic read;
-                        input [{addr_bits-1}:0] addr;
-                        output [{bits-1}:0] data;
-                        logic [{bits-1}:0] data;
-                        begin
-                            data = {path}[addr];
-                        end
-                    endtask
-                    """)
+        self.line(_RW_TASKS.substitute(addr_msb=addr_bits-1, data_msb=bits-1, path=path))
         self.tb.syn_on()
 
     def gen(self):
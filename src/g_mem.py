@@ -22,6 +22,8 @@
 g_mem module
 """
 
+from functools import lru_cache
+
 from p2v import p2v, misc, clock, clk_arst
 
 import g_mux
@@ -44,6 +46,100 @@ MAX_BANK_NUM = 128
 MAX_ROW_NUM = 128
 
 
+@lru_cache(maxsize=None)
+def _get_dims(bits, line_num, ram_bits, ram_line_num):
+    """
+    Calculate memory dimensions (cached since gen() repeats configurations).
+
+    Args:
+        bits(int): data width
+        line_num(int): line number
+        ram_bits(int): sram data width, 0 for flip-flops
+        ram_line_num(int): sram line number, 0 for flip-flops
+
+    Returns:
+        tuple of dimensions
+    """
+    if ram_bits == 0:
+        bank_num = row_num = 1
+        bits_roundup = bits
+        line_num_roundup = line_num
+    else:
+        bits_roundup = misc.roundup(bits, ram_bits)
+        bank_num = bits_roundup // ram_bits
+        line_num_roundup = misc.roundup(line_num, ram_line_num)
+        row_num = line_num_roundup // ram_line_num
+
+    lines_per_row = line_num_roundup // row_num
+    bits_per_bank = bits_roundup // bank_num
+    addr_bits = misc.log2(line_num)
+    row_addr_bits = misc.log2(lines_per_row)
+    row_sel_bits = misc.log2(row_num)
+    sram_addr_bits = misc.log2(line_num_roundup) - row_sel_bits
+    return bits_roundup, line_num_roundup, bank_num, row_num, lines_per_row, bits_per_bank, \
+           addr_bits, row_addr_bits, row_sel_bits, sram_addr_bits
+
+
+@lru_cache(maxsize=None)
+def _gen_bank_dims(ram_bits, ram_addr_bits, bit_sel, gen_ratio):
+    """
+    Clamp sram dimensions for random generation (cached since gen() is called per test).
+
+    Args:
+        ram_bits(int): sram data width
+        ram_addr_bits(int): sram address width
+        bit_sel(int): sram bit select
+        gen_ratio(int): reduction of maximal dimensions
+
+    Returns:
+        tuple of bank width and row line number
+    """
+    bits_per_bank = ram_bits
+    while bits_per_bank > (MAX_BITS_PER_BANK // gen_ratio):
+        bits_per_bank = bits_per_bank // 2
+    if bit_sel > 1:
+        bits_per_bank = misc.roundup(bits_per_bank, bit_sel)
+
+    lines_per_row = min(1 << ram_addr_bits, MAX_LINES_PER_ROW // gen_ratio) # both are powers of 2
+    return bits_per_bank, lines_per_row
+
+
+@lru_cache(maxsize=None)
+def _write_file_task(bits, line_num, row_names=None, addr_map="ROW_COL"):
+    if row_names is None: # line by line through the write task
+        loop_num = line_num
+        line_decl = f"""
+                        reg [{bits-1}:0] line_data;"""
+        body = """
+                                line_data = temp_mem[line_idx];
+                                write(line_idx, line_data);"""
+    else: # tiled, all rows are written on each iteration
+        row_num = len(row_names)
+        loop_num = line_num // row_num
+        line_decl = ""
+        body = ""
+        for y, row_name in enumerate(row_names):
+            if addr_map == "ROW_COL":
+                line_expr = f"{y * loop_num} + line_idx"
+            else:
+                line_expr = f"line_idx * {row_num} + {y}"
+            body += f"""
+                                {row_name}.write(line_idx, temp_mem[{line_expr}]);"""
+    return f"""
+                    integer line_idx = 0;
+                    task automatic write_file;
+                        input [128*8-1:0] filename;
+                        reg [{bits-1}:0] temp_mem [{line_num}];{line_decl}
+                        begin
+                            $readmemh(filename, temp_mem);
+                            for (line_idx = 0; line_idx < {loop_num}; line_idx = line_idx + 1)
+                            begin{body}
+                            end
+                        end
+                    endtask
+                """
+
+
 class g_mem(p2v):
     """
     This class creates a memory wrapper.
@@ -54,18 +150,20 @@ class g_mem(p2v):
         * single or dual ports, each can be read, write or read and write
         * same or different clocks for each port
         * bit select and byte select
+        * row select from high or low address bits (row interleaving)
         * attribute extraction from library sram
         * optional sampling of output
         * testbench tasks: read, write and load file
     """
     def module(self, clk0=default_clk0, clk1=None, name=None, sram_name=None,
-                     bits=32, line_num=1024, bit_sel=None, sample_out=False):
+                     bits=32, line_num=1024, bit_sel=None, sample_out=False, addr_map="ROW_COL",
+                     tiled_write_file=False):
         # pylint: disable=too-many-arguments,too-many-locals,too-many-branches,too-many-statements
         """
         Main function
         """
 
-        _sram_params = g_sram.g_sram(self).get_params(sram_name)
+        _sram_params = g_sram.get_params(self, sram_name)
         if sram_name is not None:
             if not _sram_params["dual_clk"]: # always allow unused clock removal
                 clk1 = None
@@ -87,6 +185,8 @@ class g_mem(p2v):
         #self.set_param(rd_en, bool, default=False) # partial banks read for power reduction
         self.set_param(bit_sel, [None, int]) # override bit_sel
         self.set_param(sample_out, bool, default=False) # sample read data for better timing
+        self.set_param(addr_map, str, addr_map in ["ROW_COL", "COL_ROW"], default="ROW_COL") # row select from high (ROW_COL) or low (COL_ROW) address bits
+        self.set_param(tiled_write_file, bool, default=False) # write_file task loads all rows per iteration
         self.set_modname(_modname)
 
         rd_en = False # TBD
@@ -99,34 +199,31 @@ class g_mem(p2v):
             if bit_sel is None:
                 bit_sel = _sram_params["bit_sel"]
 
-            self.assert_static(line_num >= ram_line_num, f"line number {line_num} is less than sram line number {ram_line_num}", warning=True)
-
-            bits_roundup = misc.roundup(bits, ram_bits)
-            bank_num = bits_roundup // ram_bits
-            line_num_roundup = misc.roundup(line_num, ram_line_num)
-            row_num = line_num_roundup // ram_line_num
-
-            self.assert_static(bank_num <= MAX_BANK_NUM, f"bank number {bank_num} exceeds maximum of {MAX_BANK_NUM}", warning=True)
-            self.assert_static(row_num <= MAX_ROW_NUM, f"row number {row_num} exceeds maximum of {MAX_ROW_NUM}", warning=True)
+            if line_num < ram_line_num:
+                self.assert_static(False, f"line number {line_num} is less than sram line number {ram_line_num}", warning=True)
 
         else:
             ram_bits = ram_line_num = 0
-            bank_num = row_num = 1
-            bits_roundup = bits
-            line_num_roundup = line_num
             port_num = 2
             if bit_sel is None:
                 bit_sel = 1
 
-        self.assert_static(bits <= MAX_BITS, f"data width {bits} exceeds maximum of {MAX_BITS}", warning=True)
-        self.assert_static(line_num <= MAX_LINE_NUM, f"line number {line_num} exceeds maximum of {MAX_LINE_NUM}", warning=True)
+        bits_roundup, line_num_roundup, bank_num, row_num, lines_per_row, bits_per_bank, \
+            addr_bits, row_addr_bits, row_sel_bits, sram_addr_bits = _get_dims(bits, line_num, ram_bits, ram_line_num)
 
+        # assertion messages are only formatted on failure
+        if bank_num > MAX_BANK_NUM:
+            self.assert_static(False, f"bank number {bank_num} exceeds maximum of {MAX_BANK_NUM}", warning=True)
+        if row_num > MAX_ROW_NUM:
+            self.assert_static(False, f"row number {row_num} exceeds maximum of {MAX_ROW_NUM}", warning=True)
 
-        gen_rows = [0]
+        if bits > MAX_BITS:
+            self.assert_static(False, f"data width {bits} exceeds maximum of {MAX_BITS}", warning=True)
+        if line_num > MAX_LINE_NUM:
+            self.assert_static(False, f"line number {line_num} exceeds maximum of {MAX_LINE_NUM}", warning=True)
 
 
-        # EXTERNAL VARIBALES WITH PRE PADDING VALUES
-        addr_bits = misc.log2(line_num)
+        gen_rows = [0]
 
 
         # SET LOCAL VARIABLES
@@ -134,14 +231,11 @@ class g_mem(p2v):
             clk1 = clk0
 
         clks = [clk0, clk1]
-        lines_per_row = line_num_roundup // row_num
-        bits_per_bank = bits_roundup // bank_num
-        row_addr_bits = misc.log2(lines_per_row)
-        row_sel_bits = misc.log2(row_num)
-        sram_addr_bits = misc.log2(line_num_roundup) - row_sel_bits
 
-        self.assert_static(bits_per_bank <= MAX_BITS_PER_BANK, f"bank bits {bits_per_bank} exceeds maximum of {MAX_BITS_PER_BANK}", warning=True)
-        self.assert_static(lines_per_row <= MAX_LINES_PER_ROW, f"row line number {line_num} exceeds maximum of {MAX_LINES_PER_ROW}", warning=True)
+        if bits_per_bank > MAX_BITS_PER_BANK:
+            self.assert_static(False, f"bank bits {bits_per_bank} exceeds maximum of {MAX_BITS_PER_BANK}", warning=True)
+        if lines_per_row > MAX_LINES_PER_ROW:
+            self.assert_static(False, f"row line number {line_num} exceeds maximum of {MAX_LINES_PER_ROW}", warning=True)
 
 
         # COMMENT CONFIGURATION
@@ -152,13 +246,16 @@ class g_mem(p2v):
         self.remark([bank_num, row_num])
 
         # PARAMETER ASSERTIONS
-        self.assert_static((bits_roundup % bank_num) == 0, f"bits {bits_roundup} must divide by bank_num {bank_num}")
-        self.assert_static((line_num_roundup % row_num) == 0, f"line_num {line_num_roundup} must divide by row_num {row_num}")
-        if row_num > 1:
-            self.assert_static(misc.is_pow2(lines_per_row), f"line number per row {lines_per_row} must be power of 2 when using multiple rows")
+        # bank_num and row_num divide the rounded up dimensions by construction (_get_dims)
+        if row_num > 1 and not misc.is_pow2(lines_per_row):
+            self.assert_static(False, f"line number per row {lines_per_row} must be power of 2 when using multiple rows")
+        if addr_map == "COL_ROW" and not misc.is_pow2(row_num):
+            self.assert_static(False, f"row number {row_num} must be power of 2 when row select uses low address bits")
         if bit_sel > 1: # byte select
-            self.assert_static((bits_roundup % bit_sel) == 0, f"byte select can only be used with bits {bits} that divides by {bit_sel}")
-            self.assert_static((bits_per_bank % bit_sel) == 0, f"byte select can only be used with bank bits_roundup {bits_per_bank} that divides by {bit_sel}")
+            if (bits_roundup % bit_sel) != 0:
+                self.assert_static(False, f"byte select can only be used with bits {bits} that divides by {bit_sel}")
+            if (bits_per_bank % bit_sel) != 0:
+                self.assert_static(False, f"byte select can only be used with bank bits_roundup {bits_per_bank} that divides by {bit_sel}")
 
 
         # PORTS
@@ -177,105 +274,121 @@ class g_mem(p2v):
         rd_addr  = {}
         rd_data  = {}
         rd_valid = {}
+        has_w    = {}
+        has_r    = {}
+        rd_data_pad = {}
+        wr_row_sel  = {}
+        rd_row_sel  = {}
+        wr_row      = {}
+        rd_row_data = {}
+        if addr_map == "ROW_COL": # consecutive addresses stay in a row
+            row_sel_start, col_start = sram_addr_bits, 0
+        else: # consecutive addresses interleave between rows
+            row_sel_start, col_start = 0, row_sel_bits
+        row_starts = [bits_roundup * y for y in range(row_num)]
+        if bit_sel == 0:
+            wr_sel_all = self.logic([bits], assign=-1) # shared by all ports
         for idx in range(port_num):
-            port_type = g_sram.g_sram(self).get_port_type(sram_name, idx=idx)
-            if "w" in port_type:
+            port_type = _sram_params[f"port{idx}"]
+            has_w[idx] = "w" in port_type
+            has_r[idx] = "r" in port_type
+            if has_w[idx]:
                 wr[idx]         = self.input()
                 wr_addr[idx]    = self.input([addr_bits])
                 wr_data[idx]    = self.input([bits])
 
                 if bit_sel == 0:
-                    wr_sel[idx] = self.logic([bits], assign=-1)
+                    wr_sel[idx] = wr_sel_all
                 elif bit_sel == 1:
                     wr_sel[idx] = self.input([bits])
                 else:
                     strb_bits = bits // bit_sel
                     wr_strb[idx] = self.input([strb_bits])
                     wr_sel[idx]  = self.logic([bits])
-                    for i in range(strb_bits):
-                        start = bit_sel * i
-                        self.assign(wr_sel[idx][start:start+bit_sel], wr_strb[idx][i] * bit_sel)
+                    sel_lanes = [wr_strb[idx][i] * bit_sel for i in range(strb_bits)]
                     bit_sel_remain = bits % bit_sel
                     if bit_sel_remain > 0:
-                        start = strb_bits * bit_sel
-                        self.assign(wr_sel[idx][start:+start+bit_sel_remain], wr_strb[idx][strb_bits-1] * bit_sel_remain)
-            else:
-                wr[idx]         = self.logic(assign=0)
-                wr_addr[idx]    = self.logic([addr_bits], assign=0)
-                wr_data[idx]    = self.logic([bits], assign=0)
-                wr_sel[idx]     = self.logic([bits], assign=0)
+                        sel_lanes.append(wr_strb[idx][strb_bits-1] * bit_sel_remain)
+                    self.assign(wr_sel[idx], misc.concat(sel_lanes[::-1])) # msb lane first
+
+                wr_row_sel[idx] = self.logic([row_num])
+                if row_num == 1:
+                    self.assign(wr_row_sel[idx], 1)
+                else: # one-hot decoder, msb row first, out of range rows select nothing
+                    self.assign(wr_row_sel[idx], misc.concat([wr_addr[idx][row_sel_start:row_sel_start+row_sel_bits] == y for y in reversed(range(row_num))]))
+                wr_row[idx] = self.logic([row_num], assign=(wr[idx] * row_num) & wr_row_sel[idx])
 
-            if "r" in port_type:
+            if has_r[idx]:
                 rd[idx]         = self.input()
                 if rd_en:
                     rd_sel[idx] = self.input([bank_num])
                 rd_addr[idx]    = self.input([addr_bits])
                 rd_data[idx]    = self.output([bits])
                 rd_valid[idx]   = self.output()
-            else:
-                rd[idx]         = self.logic(assign=0)
-                if rd_en:
-                    rd_sel[idx] = self.logic([bank_num], assign=0)
-                rd_addr[idx]    = self.logic([addr_bits], assign=0)
-                rd_data[idx]    = self.logic([bits])
-                rd_valid[idx]   = self.logic()
-                self.allow_unused([rd_data[idx], rd_valid[idx]])
-
-
-        rd_data_pad = {}
-        for idx in range(port_num):
-            rd_data_pad[idx] = self.logic([bits_roundup])
-            self.assign(rd_data[idx], rd_data_pad[idx][:bits])
-            if bits_roundup > bits:
-                self.allow_unused(rd_data_pad[idx][bits:])
 
+                if bits_roundup == bits:
+                    rd_data_pad[idx] = rd_data[idx]
+                else:
+                    rd_data_pad[idx] = self.logic([bits_roundup])
+                    self.assign(rd_data[idx], rd_data_pad[idx][:bits])
+                    self.allow_unused(rd_data_pad[idx][bits:])
 
-        wr_row_sel = {}
-        rd_row_sel = {}
-        wr_row = {}
-        rd_row_data = {}
-        for idx in range(port_num):
-            wr_row_sel[idx] = self.logic([row_num])
-            rd_row_sel[idx] = self.logic([row_num])
-            wr_row[idx] = {}
-            rd_row_data[idx] = {}
-            for y in range(row_num):
-                wr_row[idx][y] = self.logic(assign=wr[idx] & wr_row_sel[idx][y])
-                rd_row_data[idx][y] = self.logic([bits_roundup])
+                rd_row_sel[idx] = self.logic([row_num])
                 if row_num == 1:
-                    self.assign(wr_row_sel[idx][y], 1)
-                    self.assign(rd_row_sel[idx][y], 1)
-                else:
-                    self.assign(wr_row_sel[idx][y], wr_addr[idx][sram_addr_bits:sram_addr_bits+row_sel_bits] == y)
-                    self.assign(rd_row_sel[idx][y], rd_addr[idx][sram_addr_bits:sram_addr_bits+row_sel_bits] == y)
+                    self.assign(rd_row_sel[idx], 1)
+                else: # one-hot decoder, msb row first, out of range rows select nothing
+                    self.assign(rd_row_sel[idx], misc.concat([rd_addr[idx][row_sel_start:row_sel_start+row_sel_bits] == y for y in reversed(range(row_num))]))
+                rd_row_data[idx] = self.logic([row_num * bits_roundup]) # all rows packed, row 0 at lsb
+
 
         # INSTANCES OUTPUT
         rd_select = {}
-        rd_sel_pre = {}
         rd_valid_pre = {}
         for idx in range(port_num):
-            rd_select[idx] = self.logic([row_num])
-            rd_sel_pre[idx] = self.logic([row_num])
+            if not has_r[idx]:
+                continue
             rd_valid_pre[idx] = self.logic()
-            for y in range(row_num):
-                self.assign(rd_sel_pre[idx][y], rd_row_sel[idx][y])
-
-            self.sample(clks[idx], rd_select[idx], rd_sel_pre[idx], valid=rd[idx])
             self.sample(clks[idx], rd_valid_pre[idx], rd[idx])
 
+            if row_num == 1: # single row needs no read data mux
+                self.sample(clks[idx], rd_data_pad[idx], rd_row_data[idx], valid=rd_valid_pre[idx], bypass=not sample_out)
+                self.sample(clks[idx], rd_valid[idx], rd_valid_pre[idx], bypass=not sample_out)
+                continue
+
+            rd_select[idx] = self.logic([row_num])
+            self.sample(clks[idx], rd_select[idx], rd_row_sel[idx], valid=rd[idx])
+
             # READ DATA MUX
             son = g_mux.g_mux(self).module(clks[idx], num=row_num, bits=bits_roundup, encode=False, sample=sample_out, has_valid=True)
             if sample_out:
                 son.connect_in(clks[idx])
             son.connect_in(son.valid, rd_valid_pre[idx])
             son.connect_in(son.sel, rd_select[idx])
-            for y in range(row_num):
-                son.connect_in(son.din[y], rd_row_data[idx][y])
+            for y, start in enumerate(row_starts):
+                son.connect_in(son.din[y], rd_row_data[idx][start:start+bits_roundup])
             son.connect_out(son.out, rd_data_pad[idx])
             son.connect_out(son.valid_out, rd_valid[idx])
             son.inst(suffix=idx)
 
         # # G_MEM INSTANCES
+        dual_clk = clk1 != clk0
+        wr_addr_sram = {}
+        rd_addr_sram = {}
+        wr_data_pad = {}
+        wr_sel_pad = {}
+        for idx in range(port_num):
+            if has_w[idx]:
+                wr_addr_sram[idx] = self._fit_addr(wr_addr[idx], addr_bits, sram_addr_bits, start=col_start)
+                if bits_roundup == bits:
+                    wr_data_pad[idx] = wr_data[idx]
+                    wr_sel_pad[idx] = wr_sel[idx]
+                else:
+                    wr_data_pad[idx] = misc.pad(bits_roundup-bits, wr_data[idx])
+                    wr_sel_pad[idx] = misc.pad(bits_roundup-bits, wr_sel[idx])
+            if has_r[idx]:
+                rd_addr_sram[idx] = self._fit_addr(rd_addr[idx], addr_bits, sram_addr_bits, start=col_start)
+
+        row_names = [f"g_mem_row{y}" for y in range(row_num)]
         son_name = misc.cond(_modname is None, _modname, f"{_modname}_")
         son = None
         for y in range(row_num):
@@ -283,39 +396,49 @@ class g_mem(p2v):
                 son = g_mem_row.g_mem_row(self, register=False).module(clk0, clk1, name=son_name, sram_name=sram_name, \
                                                        bits=bits, line_num=lines_per_row, bit_sel=bit_sel, rd_en=rd_en)
             son.connect_in(clk0)
-            if clk1 != clk0:
+            if dual_clk:
                 son.connect_in(clk1)
             for idx in range(port_num):
-                son.connect_in(wr[idx], wr_row[idx][y])
-                if addr_bits > sram_addr_bits:
-                    son.connect_in(wr_addr[idx], wr_addr[idx][:sram_addr_bits])
+                if has_w[idx]:
+                    son.connect_in(son.wr[idx], wr_row[idx][y])
+                    son.connect_in(son.wr_addr[idx], wr_addr_sram[idx])
+                    son.connect_in(son.wr_data[idx], wr_data_pad[idx])
+                    son.connect_in(son.wr_sel[idx], wr_sel_pad[idx])
                 else:
-                    son.connect_in(wr_addr[idx], misc.pad(sram_addr_bits-addr_bits, wr_addr[idx][:addr_bits]))
-                son.connect_in(wr_data[idx], misc.pad(bits_roundup-bits, wr_data[idx]))
-                son.connect_in(wr_sel[idx], misc.pad(bits_roundup-bits, wr_sel[idx]))
-                son.connect_in(rd[idx], rd[idx] & rd_row_sel[idx][y])
-                if addr_bits > sram_addr_bits:
-                    son.connect_in(rd_addr[idx], rd_addr[idx][:sram_addr_bits])
+                    son.connect_in(son.wr[idx], 0)
+                    son.connect_in(son.wr_addr[idx], 0)
+                    son.connect_in(son.wr_data[idx], 0)
+                    son.connect_in(son.wr_sel[idx], 0)
+                if has_r[idx]:
+                    son.connect_in(son.rd[idx], rd[idx] & rd_row_sel[idx][y])
+                    son.connect_in(son.rd_addr[idx], rd_addr_sram[idx])
+                    son.connect_out(son.rd_data[idx], rd_row_data[idx][row_starts[y]:row_starts[y]+bits_roundup])
                 else:
-                    son.connect_in(rd_addr[idx], misc.pad(sram_addr_bits-addr_bits, rd_addr[idx][:addr_bits]))
-                son.connect_out(rd_data[idx], rd_row_data[idx][y])
-                son.connect_out(rd_valid[idx], None)
-            son.inst(f"g_mem_row{y}")
+                    son.connect_in(son.rd[idx], 0)
+                    son.connect_in(son.rd_addr[idx], 0)
+                    son.connect_out(son.rd_data[idx], None)
+                son.connect_out(son.rd_valid[idx], None)
+            son.inst(row_names[y])
 
 
         # ASSERTIONS
         for idx in range(port_num):
-            self.assert_property(clks[idx], ~(wr[idx] & (wr_row_sel[idx] == 0)), \
-                              misc.format_str(f"port {idx} write to address 0x%0h detected without any row selected", wr_addr[idx]), name=f"wr{idx}_no_row_sel")
-            self.assert_property(clks[idx], ~(rd[idx] & (rd_row_sel[idx] == 0)), \
-                              misc.format_str(f"port {idx} read to address 0x%0h detected without any row selected", rd_addr[idx]), name=f"rd{idx}_no_row_sel")
+            if has_w[idx]:
+                self.assert_property(clks[idx], ~(wr[idx] & (wr_row_sel[idx] == 0)), \
+                                  misc.format_str(f"port {idx} write to address 0x%0h detected without any row selected", wr_addr[idx]), name=f"wr{idx}_no_row_sel")
+            if has_r[idx]:
+                self.assert_property(clks[idx], ~(rd[idx] & (rd_row_sel[idx] == 0)), \
+                                  misc.format_str(f"port {idx} read to address 0x%0h detected without any row selected", rd_addr[idx]), name=f"rd{idx}_no_row_sel")
 
         # READ AND WRITE TASKS
-        self._tasks(bits=bits_roundup, line_num=line_num_roundup, row_num=row_num, row_sel_bits=row_sel_bits, row_addr_bits=row_addr_bits)
+        self._tasks(bits=bits_roundup, line_num=line_num_roundup, row_num=row_num, row_sel_bits=row_sel_bits, row_addr_bits=row_addr_bits, row_names=row_names, addr_map=addr_map, \
+                    tiled_write_file=tiled_write_file)
         
         for idx in range(port_num):
-            self.assert_property(clks[idx], misc.pad(1, wr_addr[idx]) < misc.dec(line_num, bits=addr_bits+1), misc.format_str(f"port{idx} write address 0x%0h is out of memory size 0x%0h", [wr_addr[idx], line_num]))
-            self.assert_property(clks[idx], misc.pad(1, rd_addr[idx]) < misc.dec(line_num, bits=addr_bits+1), misc.format_str(f"port {idx} read address 0x%0h is out of memory size 0x%0h", [rd_addr[idx], line_num]))
+            if has_w[idx]:
+                self.assert_property(clks[idx], misc.pad(1, wr_addr[idx]) < misc.dec(line_num, bits=addr_bits+1), misc.format_str(f"port{idx} write address 0x%0h is out of memory size 0x%0h", [wr_addr[idx], line_num]))
+            if has_r[idx]:
+                self.assert_property(clks[idx], misc.pad(1, rd_addr[idx]) < misc.dec(line_num, bits=addr_bits+1), misc.format_str(f"port {idx} read address 0x%0h is out of memory size 0x%0h", [rd_addr[idx], line_num]))
 
 
         return self.write()
@@ -323,51 +446,48 @@ class g_mem(p2v):
 
 
 
-    def _tasks(self, bits, line_num, row_num, row_sel_bits, row_addr_bits):
+    def _fit_addr(self, addr, addr_bits, sram_addr_bits, start=0):
+        if start > 0:
+            addr = addr[start:]
+            addr_bits -= start
+        if addr_bits == sram_addr_bits:
+            return addr
+        if addr_bits > sram_addr_bits:
+            return addr[:sram_addr_bits]
+        return misc.pad(sram_addr_bits-addr_bits, addr)
+
+    def _tasks(self, bits, line_num, row_num, row_sel_bits, row_addr_bits, row_names, addr_map="ROW_COL", tiled_write_file=False):
+        # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
         self.tb.syn_off()
+        dec_strs = [misc.dec(y, row_sel_bits) for y in range(row_num)]
+        if addr_map == "ROW_COL":
+            row_sel_start, col_start = row_addr_bits, 0
+        else:
+            row_sel_start, col_start = 0, row_sel_bits
+        if row_num == 1:
+            row_idx = None
+        else:
+            row_idx = misc._declare("addr", row_sel_bits, start=row_sel_start)
+        row_addr = misc.pad(32-row_addr_bits, misc._declare("addr", row_addr_bits, start=col_start))
         for name in ["write", "read"]:
-            self.line(f"""
-                        task automatic {name};
-                            input [31:0] addr; // larger to allow error
-                            {misc.cond(name == "write", "input", "output")} [{bits-1}:0] data;
-                            begin
-                        """)
-            if row_num == 1:
-                row_idx = None
-            else:
-                row_idx = misc._declare("addr", row_sel_bits, start=row_addr_bits)
-            row_addr = misc.pad(32-row_addr_bits, misc._declare("addr", row_addr_bits))
+            body = []
             for y in range(row_num):
                 if row_idx is not None:
-                    self.line(f"if ({row_idx} == {misc.dec(y, row_sel_bits)})")
-                self.line(f"g_mem_row{y}.{name}({row_addr}, data);")
-            self.line("""
-                            end
-                        endtask
-
-                      """)
+                    body.append(f"if ({row_idx} == {dec_strs[y]})")
+                body.append(f"{row_names[y]}.{name}({row_addr}, data);")
+            body = "\n".join(body)
+            self.line(g_mem_row.RW_TASK.substitute(name=name, data_dir=misc.cond(name == "write", "input", "output"), data_msb=bits-1, body=body))
 
-        self.line(f"""
-                    integer line_idx = 0;
-                    task automatic write_file;
-                        input [128*8-1:0] filename;
-                        reg [{bits-1}:0] temp_mem [{line_num}];
-                        reg [{bits-1}:0] line_data;
-                        begin
-                            $readmemh(filename, temp_mem);
-                            for (line_idx = 0; line_idx < {line_num}; line_idx = line_idx + 1)
-                            begin
-                                line_data = temp_mem[line_idx];
-                                write(line_idx, line_data);
-                            end
-                        end
-                    endtask
-                """)
+        if tiled_write_file:
+            self.line(_write_file_task(bits, line_num, row_names=tuple(row_names), addr_map=addr_map))
+        else:
+            self.line(_write_file_task(bits, line_num))
         self.tb.syn_on()
 
 
     def gen(self, name=None, sram_name=None
                   ):
+        # pylint: disable=too-many-locals
         """
         Reserved gen function.
 
@@ -388,35 +508,24 @@ class g_mem(p2v):
             args["line_num"] = self.tb.rand_list([self.tb.rand_int(2, 32), self.tb.rand_int(2, MAX_LINES_PER_ROW // gen_ratio)])
             bit_sel = 1
             dual_clk = self.tb.rand_bool()
+            addr_maps = ["ROW_COL", "COL_ROW"] # single row
 
         else:
-            _sram_params = g_sram.g_sram(self).get_params(sram_name)
-            bits_per_bank = _sram_params["bits"]
-            ram_addr_bits = _sram_params["addr_bits"]
+            _sram_params = g_sram.get_params(self, sram_name)
             dual_clk = _sram_params["dual_clk"]
             bit_sel = _sram_params["bit_sel"]
-            lines_per_row = 1 << ram_addr_bits
+            bits_per_bank, lines_per_row = _gen_bank_dims(_sram_params["bits"], _sram_params["addr_bits"], bit_sel, gen_ratio)
             bank_num = self.tb.rand_int(1, MAX_BANK_NUM // gen_ratio)
 
-            while bits_per_bank > (MAX_BITS_PER_BANK // gen_ratio):
-                bits_per_bank = bits_per_bank // 2
-            if bit_sel > 1:
-                bits_per_bank = misc.roundup(bits_per_bank, bit_sel)
-
-            while lines_per_row > (MAX_LINES_PER_ROW // gen_ratio):
-                lines_per_row = lines_per_row // 2
-
+            bank_num = min(bank_num, (MAX_BITS // gen_ratio) // bits_per_bank)
             args["bits"] = bits_per_bank * bank_num
-            while args["bits"] > (MAX_BITS // gen_ratio):
-                bank_num = bank_num - 1
-                args["bits"] = bits_per_bank * bank_num
 
             row_num = self.tb.rand_int(1, (MAX_ROW_NUM // gen_ratio))
             if row_num > 1:
                 lines_per_row = 1 << misc.log2(lines_per_row) # power of 2
-            args["line_num"] = lines_per_row * row_num
-            while args["line_num"] > (MAX_LINE_NUM // gen_ratio):
-                args["line_num"] = args["line_num"] // 2
+            args["line_num"] = min(lines_per_row * row_num, MAX_LINE_NUM // gen_ratio)
+            row_num = _get_dims(args["bits"], args["line_num"], _sram_params["bits"], _sram_params["line_num"])[3]
+            addr_maps = misc.cond(misc.is_pow2(row_num), ["ROW_COL", "COL_ROW"], ["ROW_COL"])
 
 
 
@@ -432,6 +541,8 @@ class g_mem(p2v):
 
         #args["rd_en"] =  TBD - implement - self.tb.rand_bool()
         args["sample_out"] = self.tb.rand_bool()
+        args["addr_map"] = self.tb.rand_list(addr_maps)
+        args["tiled_write_file"] = self.tb.rand_bool()
 
         args["sram_name"] = sram_name
         if name is None:
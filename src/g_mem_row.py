@@ -22,11 +22,24 @@
 g_mem_row module
 """
 
+from string import Template
+
 from p2v import p2v, misc, clock, default_clk
 
 import g_sram
 import g_mem_single
 
+# read/write task calling each sub-instance, also used by g_mem for its rows
+RW_TASK = Template("""
+                        task automatic $name;
+                            input [31:0] addr; // larger to allow error
+                            $data_dir [$data_msb:0] data;
+                            begin
+$body
+                            end
+                        endtask
+                        """)
+
 class g_mem_row(p2v):
     """
     This class creates a row of memory wrapper (internal class for g_mem).
@@ -60,8 +73,8 @@ class g_mem_row(p2v):
         port_num = 2
         pad_left = 0
         gen_banks = [0]
-        sram_params = g_sram.g_sram(self).get_params(sram_name)
         if sram_name is not None:
+            sram_params = g_sram.get_params(self, sram_name)
             line_num = sram_params["line_num"]
             port_num = misc.cond(sram_params["port1"] != "", 2, 1)
             ram_bits = sram_params["bits"]
@@ -94,6 +107,9 @@ class g_mem_row(p2v):
         rd_addr  = {}
         rd_data  = {}
         rd_valid = {}
+        rd_sel_all = None
+        if not rd_en:
+            rd_sel_all = self.logic([bank_num], assign=-1) # shared by all ports
         for idx in range(port_num):
             wr       [idx] = self.input()
             wr_addr  [idx] = self.input([addr_bits])
@@ -103,28 +119,44 @@ class g_mem_row(p2v):
             if rd_en:
                 rd_sel [idx] = self.input([bank_num])
             else:
-                rd_sel [idx] = self.logic([bank_num], assign=-1)
+                rd_sel [idx] = rd_sel_all
             rd_addr  [idx] = self.input([addr_bits])
             rd_data  [idx] = self.output([bits])
             rd_valid [idx] = self.output()
 
 
+        bank_starts = [bits_per_bank * x for x in range(bank_num)]
         bank_wr_sel = {}
         bank_rd_sel = {}
         wr_bank = {}
         wr_bank_sel = {}
+        wr_bank_data = {}
+        rd_bank = {}
+        rd_bank_data = {}
         for idx in range(port_num):
-            bank_wr_sel[idx] = self.logic([bank_num])
-            bank_rd_sel[idx] = self.logic([bank_num])
             wr_bank[idx] = {}
             wr_bank_sel[idx] = {}
-            for x in range(bank_num):
-                start = bits_per_bank * x
+            wr_bank_data[idx] = {}
+            rd_bank[idx] = {}
+            rd_bank_data[idx] = {}
+            if bank_num == 1: # single bank takes the port as is, write still gated by its select
+                bank_wr_sel[idx] = self.logic(assign=wr_sel[idx] > 0)
+                bank_rd_sel[idx] = rd_sel[idx]
+                wr_bank[idx][0] = self.logic(assign=wr[idx] & bank_wr_sel[idx])
+                wr_bank_sel[idx][0] = wr_sel[idx]
+                wr_bank_data[idx][0] = wr_data[idx]
+                rd_bank[idx][0] = rd[idx] & bank_rd_sel[idx]
+                rd_bank_data[idx][0] = rd_data[idx]
+                continue
+            bank_wr_sel[idx] = self.logic([bank_num])
+            bank_rd_sel[idx] = self.logic([bank_num], assign=rd_sel[idx])
+            for x, start in enumerate(bank_starts):
                 wr_bank[idx][x] = self.logic(assign=wr[idx] & bank_wr_sel[idx][x])
                 wr_bank_sel[idx][x] = self.logic([bits_per_bank], assign=wr_sel[idx][start:start+bits_per_bank])
-
-                self.assign(bank_wr_sel[idx][x], wr_bank_sel[idx][x]> 0)
-                self.assign(bank_rd_sel[idx][x], rd_sel[idx][x])
+                wr_bank_data[idx][x] = wr_data[idx][start:start+bits_per_bank]
+                rd_bank[idx][x] = rd[idx] & bank_rd_sel[idx][x]
+                rd_bank_data[idx][x] = rd_data[idx][start:start+bits_per_bank]
+            self.assign(bank_wr_sel[idx], misc.concat([wr_bank_sel[idx][x] > 0 for x in reversed(range(bank_num))])) # msb bank first
 
 
         # G_MEM INSTANCES
@@ -138,14 +170,13 @@ class g_mem_row(p2v):
             if clk1 != clk0:
                 son.connect_in(clk1)
             for idx in range(port_num):
-                start = bits_per_bank * x
                 son.connect_in(son.wr[idx], wr_bank[idx][x])
-                son.connect_in(son.wr_addr[idx], wr_addr[idx][:addr_bits])
-                son.connect_in(son.wr_data[idx], wr_data[idx][start:start+bits_per_bank])
+                son.connect_in(son.wr_addr[idx], wr_addr[idx])
+                son.connect_in(son.wr_data[idx], wr_bank_data[idx][x])
                 son.connect_in(son.wr_sel[idx], wr_bank_sel[idx][x])
-                son.connect_in(son.rd[idx], rd[idx] & bank_rd_sel[idx][x])
-                son.connect_in(son.rd_addr[idx], rd_addr[idx][:addr_bits])
-                son.connect_out(son.rd_data[idx], rd_data[idx][start:start+bits_per_bank])
+                son.connect_in(son.rd[idx], rd_bank[idx][x])
+                son.connect_in(son.rd_addr[idx], rd_addr[idx])
+                son.connect_out(son.rd_data[idx], rd_bank_data[idx][x])
                 son.connect_out(son.rd_valid[idx], None)
             son.inst(f"g_mem_bank{x}")
 
@@ -170,18 +201,11 @@ class g_mem_row(p2v):
 
     def _tasks(self, bits, bank_num, bits_per_bank):
         self.tb.syn_off()
+        data_strs = [misc._declare('data', bits_per_bank, start=bits_per_bank*x) for x in range(bank_num)]
+        tasks = []
         for name in ["write", "read"]:
-            self.line(f"""
-                        task automatic {name};
-                            input [31:0] addr; // larger to allow error
-                            {misc.cond(name == "write", "input", "output")} [{bits-1}:0] data;
-                            begin
-                        """)
-            for x in range(bank_num):
-                self.line(f"g_mem_bank{x}.{name}(addr, {misc._declare('data', bits_per_bank, start=bits_per_bank*x)});")
-            self.line("""
-                            end
-                        endtask
-                        """)
+            body = "\n".join([f"g_mem_bank{x}.{name}(addr, {data_strs[x]});" for x in range(bank_num)])
+            tasks.append(RW_TASK.substitute(name=name, data_dir=misc.cond(name == "write", "input", "output"), data_msb=bits-1, body=body))
+        self.line("".join(tasks))
         self.tb.syn_on()
 
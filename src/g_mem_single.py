@@ -22,11 +22,22 @@
 g_mem_row module
 """
 
+from string import Template
+
 from p2v import p2v, misc, clock, default_clk
 
-import g_mem
 import g_sram
 
+_RW_TASK = Template("""
+                        task automatic $name;
+                            input [31:0] addr; // larger to allow error
+                            $data_dir [$data_msb:0] data;
+                            begin
+                                sram.$name($addr, data);
+                            end
+                        endtask
+                    """)
+
 class g_mem_single(p2v):
     """
     This class creates a row of memory wrapper (internal class for g_mem).
@@ -55,8 +66,8 @@ class g_mem_single(p2v):
         self.set_modname(_modname)
 
 
-        sram_params = g_sram.g_sram(self).get_params(sram_name)
         if sram_name is not None:
+            sram_params = g_sram.get_params(self, sram_name)
             bits = sram_params["bits"]
             line_num = sram_params["line_num"]
             port_num = misc.cond(sram_params["port1"] != "", 2, 1)
@@ -93,27 +104,20 @@ class g_mem_single(p2v):
             rd_data  [idx] = self.output([bits])
             rd_valid [idx] = self.output()
 
-        bank_num = row_num = 1
-        multi_bits = bits
-        multi_line_num = line_num
-
-        if bank_num == row_num == 1:
-            pad_bits = pad_lines = 0
-            actual_sram_name = sram_name
-            son = g_sram.g_sram(self).module(clk0, clk1, sram_name=actual_sram_name, bits=bits, line_num=line_num, pad_bits=pad_bits, pad_lines=pad_lines)
-            son.connect_in(clk0)
-            if clk1 != clk0:
-                son.connect_in(clk1)
-            for idx in range(port_num):
-                son.connect_in(wr[idx])
-                son.connect_in(wr_addr[idx])
-                son.connect_in(wr_data[idx])
-                son.connect_in(wr_sel[idx])
-                son.connect_in(rd[idx])
-                son.connect_in(rd_addr[idx])
-                son.connect_out(rd_data[idx])
-                son.connect_out(rd_valid[idx])
-            son.inst("sram")
+        son = g_sram.g_sram(self).module(clk0, clk1, sram_name=sram_name, bits=bits, line_num=line_num, pad_bits=0, pad_lines=0)
+        son.connect_in(clk0)
+        if clk1 != clk0:
+            son.connect_in(clk1)
+        for idx in range(port_num):
+            son.connect_in(wr[idx])
+            son.connect_in(wr_addr[idx])
+            son.connect_in(wr_data[idx])
+            son.connect_in(wr_sel[idx])
+            son.connect_in(rd[idx])
+            son.connect_in(rd_addr[idx])
+            son.connect_out(rd_data[idx])
+            son.connect_out(rd_valid[idx])
+        son.inst("sram")
 
 
 
@@ -130,15 +134,10 @@ class g_mem_single(p2v):
 
     def _tasks(self, bits, addr_bits):
         self.tb.syn_off()
+        addr = misc._declare('addr', addr_bits)
+        tasks = []
         for name in ["write", "read"]:
-            self.line(f"""
-                        task automatic {name};
-                            input [31:0] addr; // larger to allow error
-                            {misc.cond(name == "write", "input", "output")} [{bits-1}:0] data;
-                            begin
-                                sram.{name}({misc._declare('addr', addr_bits)}, data);
-                            end
-                        endtask
-                    """)
+            tasks.append(_RW_TASK.substitute(name=name, data_dir=misc.cond(name == "write", "input", "output"), data_msb=bits-1, addr=addr))
+        self.line("".join(tasks))
         self.tb.syn_on()
 
@@ -22,27 +22,50 @@
 g_mem_top module
 """
 
+import ast
+import operator
+
 from p2v import p2v, clk_arst, clk_srst
 
 import g_mem
 import g_sram
 
+_LINE_NUM_OPS = {ast.Mult: operator.mul, ast.LShift: operator.lshift}
+
+def _eval_line_num(node):
+    # integer constants combined with * and << only, no larger than the maximal line number
+    if isinstance(node, ast.Expression):
+        return _eval_line_num(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) is int: # pylint: disable=unidiomatic-typecheck
+        value = node.value
+    elif isinstance(node, ast.BinOp) and type(node.op) in _LINE_NUM_OPS:
+        left = _eval_line_num(node.left)
+        right = _eval_line_num(node.right)
+        if isinstance(node.op, ast.LShift) and right >= g_mem.MAX_LINE_NUM.bit_length():
+            raise ValueError(f"shift by {right} exceeds maximal line number")
+        value = _LINE_NUM_OPS[type(node.op)](left, right)
+    else:
+        raise ValueError(f"unsupported expression {ast.dump(node)}")
+    if value > g_mem.MAX_LINE_NUM:
+        raise ValueError(f"{value} exceeds maximal line number")
+    return value
+
 class g_mem_top(p2v):
     """
     This class creates a single interface for all memory modules.
     """
 
     def module(self, name=None, sram_name=None, bits=64, line_num=1024,
-               sample_rd_out=False, sync_reset=False):
+               sample_rd_out=False, sync_reset=False, addr_map="ROW_COL", tiled_write_file=False):
         # pylint: disable=too-many-arguments
         """
         Main function
         """
         if isinstance(line_num, str):
             try: # support string line number line="256*1024"
-                line_num = eval(line_num) # pylint: disable=(eval-used
-            except RuntimeError:
-                pass
+                line_num = _eval_line_num(ast.parse(line_num, mode="eval"))
+            except (SyntaxError, ValueError):
+                self._raise(f"failed to parse line number {line_num}, only integers with * and << up to {g_mem.MAX_LINE_NUM} are supported")
 
         self.set_param(name, [None, str], default=None) # explicitly set module name
         self.set_param(sram_name, [None, str], default=None) # name of sram verilog module, None uses flip-flops
@@ -50,6 +73,8 @@ class g_mem_top(p2v):
         self.set_param(line_num, int, line_num > 1) # line number
         self.set_param(sample_rd_out, bool, default=False) # sample read port outputs for better timing
         self.set_param(sync_reset, bool, default=False) # use sync reset instead of async reset
+        self.set_param(addr_map, str, addr_map in ["ROW_COL", "COL_ROW"], default="ROW_COL") # row select from high (ROW_COL) or low (COL_ROW) address bits
+        self.set_param(tiled_write_file, bool, default=False) # write_file task loads all rows per iteration
         self.set_modname("")
 
 
@@ -59,19 +84,13 @@ class g_mem_top(p2v):
         )
 
         # common arguments
-        args = {}
-        args["clk0"] = clk0
-        args["clk1"] = clk1
-        args["name"] = name
-        args["sram_name"] = sram_name
-        args["bits"] = bits
-        args["line_num"] = line_num
+        args = {"clk0": clk0, "clk1": clk1, "name": name, "sram_name": sram_name, "bits": bits, "line_num": line_num}
 
 
         if True: # pylint: disable=using-constant-test
 
             g_mem.g_mem(self).module(**args, \
-                                     sample_out=sample_rd_out)
+                                     sample_out=sample_rd_out, addr_map=addr_map, tiled_write_file=tiled_write_file)
 
 
     def get_clks(self, sram_name, sync_reset=False \
@@ -79,7 +98,7 @@ class g_mem_top(p2v):
         """
         Set clock reset type and prefix according to bus functionality
         """
-        sram_params = g_sram.g_sram(self).get_params(sram_name)
+        sram_params = g_sram.get_params(self, sram_name)
         port0_wr = sram_params["port0"] == "w"
         port0_rd = sram_params["port0"] == "r"
         port1_wr = sram_params["port1"] == "w"
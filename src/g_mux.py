@@ -67,25 +67,25 @@ class g_mux(p2v):
         out = self.output([bits])
 
 
-        decoded_sel = self.logic([num])
-        if encode:
-            for n in range(num):
-                self.assign(decoded_sel[n], sel == n)
-        else:
-            self.assign(decoded_sel, sel)
-
-        sel_lines = []
-        for n in range(num):
-            sel_bus = misc.concat(bits * [decoded_sel[n]])
-            sel_lines.append(sel_bus & din[n])
-        mux_lines = misc.concat(sel_lines, sep="|\n")
+        if num == 1: # single input is only gated by its selector
+            if encode:
+                mux_lines = (~sel * bits) & din[0]
+            else:
+                mux_lines = (sel * bits) & din[0]
+        else: # parallel and-or tree
+            decoded_sel = self.logic([num])
+            if encode: # out of range selector selects no input
+                self.assign(decoded_sel, misc.concat([sel == n for n in reversed(range(num))])) # msb input first
+            else:
+                self.assign(decoded_sel, sel)
+            mux_lines = misc.concat([(decoded_sel[n] * bits) & din[n] for n in range(num)], sep="|\n") # replicated select masks data
 
         self.sample(clk, out, mux_lines, valid=valid, bypass=not sample)
         if has_valid:
             self.sample(clk, valid_out, valid, bypass=not sample)
 
         if not encode and sample:
-            self.assume_property(clk, misc.onehot0(sel), "mux decoded selector must be zero or hotone")
+            self.assume_property(clk, (sel & (sel - 1)) == 0, "mux decoded selector must be zero or hotone") # at most one bit set
 
         return self.write()
 
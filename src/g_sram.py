@@ -22,12 +22,69 @@
 g_sram module
 """
 
+from string import Template
+
 from p2v import p2v, clock, misc, default_clk
 
 import g_ff_array
 
 MAX_PORTS = 2
 
+_RW_TASKS = Template("""
+                    task automatic write;
+                        input [$addr_msb:0] addr;
+                        input [$data_msb:0] data;
+                        begin
+                            $path[$addr] = $data;
+                        end
+                    endtask
+
+                    task automatic read;
+                        input [$addr_msb:0] addr;
+                        output [$data_msb:0] data;
+                        logic [$data_msb:0] data;
+                        begin
+                            data = $path[$addr];
+                        end
+                    endtask
+                    """)
+
+# per port keys of parameter and library port name tables
+_PORT_KEYS = tuple({kind: f"{kind}{n}" for kind in ["port", "clk", "csb", "web", "din", "addr", "wsel", "dout"]} for n in range(MAX_PORTS))
+
+# library port names (None is a missing port)
+_OPENRAM_NAMES = {"mem": "mem", **{f"{kind}{n}": f"{lib_kind}{n}" for n in range(MAX_PORTS) for kind, lib_kind in
+                                    [("clk", "clk"), ("csb", "csb"), ("web", "web"), ("din", "din"),
+                                     ("addr", "addr"), ("wsel", "wmask"), ("dout", "dout")]}}
+
+_TSMC_1W1R_NAMES = {"mem": "u_ram_core.memory",
+                    "clk0": "CLKW", "csb0": None, "web0": "WEB", "addr0": "AA", "din0": "D",  "wsel0": "BWEB", "dout0": None,
+                    "clk1": "CLKR", "csb1": None, "web1": "REB", "addr1": "AB", "din1": None, "wsel1": None,   "dout1": "Q"}
+
+_TSMC_1RW_NAMES = {"mem": "u_ram_core.memory",
+                   "clk0": "CLK", "csb0": "CEB", "web0": "WEB", "addr0": "A", "din0": "D",  "wsel0": "BWEB", "dout0": "Q",
+                   "clk1": None,  "csb1": None,  "web1": None,  "addr1": None, "din1": None, "wsel1": None,   "dout1": None}
+
+_ports_cache = {} # sram_name -> (verilog ports, library port names)
+_present_cache = {} # sram_name -> library port name -> exists in sram
+_params_cache = {None: {"port0":"w", "port1":"r", "bit_sel":1}} # sram_name -> parameters, library srams do not change during generation
+
+
+def get_params(parent, sram_name):
+    """
+    Get dictionary of sram parameters, a g_sram instance is only created on first use of an sram.
+
+    Args:
+        parent(p2v): calling module
+        sram_name([str, None]): sram_name, None is ff implementation
+
+    Returns:
+        dict
+    """
+    if sram_name in _params_cache:
+        return _params_cache[sram_name]
+    return g_sram(parent).get_params(sram_name)
+
 class g_sram(p2v):
     """
     This class creates an sram wrapper.
@@ -67,10 +124,13 @@ class g_sram(p2v):
         clks = [clk0, clk1]
         addr_bits = _addr_bits
         pad_addr_bits = misc.log2(line_num) - addr_bits
+        port_addr_bits = addr_bits + pad_addr_bits
+        port_bits = bits + pad_bits
+        port_types = [_sram_params[keys["port"]] for keys in _PORT_KEYS]
 
         self.line()
-        for n in range(MAX_PORTS):
-            self.remark(f"sram port {n}: {_sram_params[f'port{n}']}")
+        for n, port in enumerate(port_types):
+            self.remark(f"sram port {n}: {port}")
         self.line()
 
         wr       = {}
@@ -83,22 +143,31 @@ class g_sram(p2v):
         rd_valid = {}
         
         port_idxs = []
-        for n in range(MAX_PORTS):
-            port = _sram_params[f"port{n}"]
+        for n, port in enumerate(port_types):
             if port != "":
                 port_idxs.append(n)
                 if clks[n] is not None and (n==0 or clks[n] != clks[n-1]):
                     self.input(clks[n])
                 wr[n]      = self.input()
-                wr_addr[n] = self.input([addr_bits+pad_addr_bits])
-                wr_data[n] = self.input([bits+pad_bits])
-                wr_sel[n]  = self.input([bits+pad_bits])
+                wr_addr[n] = self.input([port_addr_bits])
+                wr_data[n] = self.input([port_bits])
+                wr_sel[n]  = self.input([port_bits])
                 if bit_sel == 0:
                     self.allow_unused(wr_sel[n])
                 rd[n]       = self.input()
-                rd_addr[n]  = self.input([addr_bits+pad_addr_bits])
-                rd_data[n]  = self.output([bits+pad_bits])
+                rd_addr[n]  = self.input([port_addr_bits])
+                rd_data[n]  = self.output([port_bits])
                 rd_valid[n] = self.output()
+                if "w" not in port:
+                    self.allow_unused([wr[n], wr_addr[n], wr_data[n], wr_sel[n]])
+                    self.assert_property(clks[n], ~wr[n], f"write detected on read only port {n}")
+                if "r" in port:
+                    self.sample(clks[n], rd_valid[n], rd[n])
+                else:
+                    self.allow_unused([rd[n], rd_addr[n]])
+                    self.assert_property(clks[n], ~rd[n], f"read detected on write only port {n}")
+                    self.assign(rd_data[n], 0)
+                    self.assign(rd_valid[n], 0)
                 
 
         if sram_name is None:
@@ -120,46 +189,45 @@ class g_sram(p2v):
         else:
             # create write select
             wsel = {}
-            for n in range(MAX_PORTS):
-                port = _sram_params[f"port{n}"]
+            for n, port in enumerate(port_types):
                 if "w" in port and bit_sel > 0:
                     wsel[n] = self.logic(bits // bit_sel)
                     if bit_sel == 1:
                         self.assign(wsel[n], wr_sel[n][:bits])
                     else:
-                        for i in range(bits // bit_sel):
-                            start = bit_sel*i
-                            self.assign(wsel[n][i], wr_sel[n][start:start+bit_sel] > 0)
+                        lanes = [wr_sel[n][start:start+bit_sel] > 0 for start in range(0, bits - bit_sel + 1, bit_sel)]
+                        self.assign(wsel[n], misc.concat(lanes[::-1])) # msb lane first
                 else:
                     wsel[n] = None
     
-            signals = self._get_verilog_ports(sram_name)
-            names = self._get_lib_names(signals)
-            conn = self._get_lib_conn(signals, wr, wr_addr, wr_data, wsel, rd, rd_addr, rd_data)
+            signals, names = self._get_ports(sram_name)
+            conn = self._get_lib_conn(names, wr, wr_addr, wr_data, wsel, rd, rd_addr, rd_data)
 
             addr = {}
             son = self.verilog_module(sram_name)
             for n in port_idxs:
-                addr[n] = self.logic([addr_bits+pad_addr_bits])
-                self.assign(addr[n], conn[f"addr{n}"])
-                son.connect_in(names[f"clk{n}"], clks[n].name)
-                son.connect_in(names[f"addr{n}"], addr[n][:addr_bits])
-                if self._check_port(sram_name, f"csb{n}"):
-                    son.connect_in(names[f"csb{n}"], conn[f"csb{n}"])
-                if self._check_port(sram_name, f"web{n}"):
-                    son.connect_in(names[f"web{n}"], conn[f"web{n}"])
-                if self._check_port(sram_name, f"din{n}"):
-                    son.connect_in(names[f"din{n}"], conn[f"din{n}"][:bits])
-                if self._check_port(sram_name, f"wsel{n}"):
-                    son.connect_in(names[f"wsel{n}"], conn[f"wsel{n}"])
-                if self._check_port(sram_name, f"dout{n}"):
-                    son.connect_out(names[f"dout{n}"], rd_data[n][:bits])
+                addr[n] = self.logic([port_addr_bits])
+                keys = _PORT_KEYS[n]
+                self.assign(addr[n], conn[keys["addr"]])
+                son.connect_in(names[keys["clk"]], clks[n].name)
+                son.connect_in(names[keys["addr"]], addr[n][:addr_bits])
+                if self._check_port(sram_name, keys["csb"]):
+                    son.connect_in(names[keys["csb"]], conn[keys["csb"]])
+                if self._check_port(sram_name, keys["web"]):
+                    son.connect_in(names[keys["web"]], conn[keys["web"]])
+                if self._check_port(sram_name, keys["din"]):
+                    son.connect_in(names[keys["din"]], conn[keys["din"]][:bits])
+                if self._check_port(sram_name, keys["wsel"]):
+                    son.connect_in(names[keys["wsel"]], conn[keys["wsel"]])
+                if self._check_port(sram_name, keys["dout"]):
+                    son.connect_out(names[keys["dout"]], rd_data[n][:bits])
                     if pad_bits > 0:
                         self.assign(rd_data[n][bits:], 0)
 
             # connect unused signals
-            for name, signal in signals.items():
-                if name not in son._pins:
+            pins = set(son._pins)
+            for name, signal in signals.items(): # keep port order for stable output
+                if name not in pins:
                     if signal._kind == "input":
                         son.connect_in(name, 0)
                     elif signal._kind == "output":
@@ -169,167 +237,65 @@ class g_sram(p2v):
             path = f"sram.{names['mem']}"
 
 
-        for n in port_idxs:
-            port = _sram_params[f"port{n}"]
-            if "w" not in port:
-                self.allow_unused(wr[n])
-                self.allow_unused(wr_addr[n])
-                self.allow_unused(wr_data[n])
-                self.allow_unused(wr_sel[n])
-                self.assert_property(clks[n], ~wr[n], f"write detected on read only port {n}")
-            if "r" in port:
-                self.sample(clks[n], rd_valid[n], rd[n])
-            else:
-                self.allow_unused(rd[n])
-                self.allow_unused(rd_addr[n])
-                self.assert_property(clks[n], ~rd[n], f"read detected on write only port {n}")
-                self.assign(rd_data[n], 0)
-                self.assign(rd_valid[n], 0)
-
-
         self.tb.syn_off()
-        self.line(f"""
-                    task automatic write;
-                        input [{addr_bits+pad_addr_bits-1}:0] addr;
-                        input [{bits+pad_bits-1}:0] data;
-                        begin
-                            {path}[{misc._declare("addr", addr_bits)}] = {misc._declare("data", bits)};
-                        end
-                    endtask
-
-                    task automatic read;
-                        input [{addr_bits+pad_addr_bits-1}:0] addr;
-                        output [{bits+pad_bits-1}:0] data;
-                        logic [{bits+pad_bits-1}:0] data;
-                        begin
-                            data = {path}[{misc._declare('addr', addr_bits)}];
-                        end
-                    endtask
-                    """)
+        self.line(_RW_TASKS.substitute(addr_msb=port_addr_bits-1, data_msb=port_bits-1, path=path, \
+                                       addr=misc._declare("addr", addr_bits), data=misc._declare("data", bits)))
         self.tb.syn_on()
 
         return self.write()
 
 
     def _get_lib_names(self, signals):
-        names = {}
+        names = None
 
         # openram
         if "din0" in signals and "addr0" in signals:
-            names["mem"] = "mem"
-            for n in range(MAX_PORTS):
-                names[f"clk{n}"]  = f"clk{n}"
-                names[f"csb{n}"]  = f"csb{n}"
-                names[f"web{n}"]  = f"web{n}"
-                names[f"din{n}"]  = f"din{n}"
-                names[f"addr{n}"] = f"addr{n}"
-                names[f"wsel{n}"] = f"wmask{n}"
-                names[f"dout{n}"] = f"dout{n}"
+            names = _OPENRAM_NAMES
 
         # tsmc
         elif "D" in signals and "Q" in signals:
-            names["mem"] = "u_ram_core.memory"
             if "AA" in signals and "CLKW" in signals: # one write port and one read port
-                names["clk0"]  = "CLKW"
-                names["csb0"]  = None
-                names["web0"]  = "WEB"
-                names["addr0"] = "AA"
-                names["din0"]  = "D"
-                names["wsel0"] = "BWEB"
-                names["dout0"] = None
-
-                names["clk1"]  = "CLKR"
-                names["csb1"]  = None
-                names["web1"]  = "REB"
-                names["addr1"] = "AB"
-                names["din1"]  = None
-                names["wsel1"] = None
-                names["dout1"] = "Q"
+                names = _TSMC_1W1R_NAMES
             else: # one port for read and write
-                names["clk0"]  = "CLK"
-                names["csb0"]  = "CEB"
-                names["web0"]  = "WEB"
-                names["addr0"] = "A"
-                names["din0"]  = "D"
-                names["wsel0"] = "BWEB"
-                names["dout0"] = "Q"
-
-                names["clk1"]  = None
-                names["csb1"]  = None
-                names["web1"]  = None
-                names["addr1"] = None
-                names["din1"] = None
-                names["wsel1"] = None
-                names["dout1"] = None
+                names = _TSMC_1RW_NAMES
 
         else:
             self._raise("failed to find sram port connectivity")
 
         return names
 
-    def _get_lib_conn(self, signals, wr, wr_addr, wr_data, wsel, rd, rd_addr, rd_data):
-        conn = {}
+    def _get_lib_conn(self, names, wr, wr_addr, wr_data, wsel, rd, rd_addr, rd_data):
+        conn = dict.fromkeys(names) # ports without a connection stay None
+        conn["mem"] = names["mem"]
 
         # openram
-        if "din0" in signals and "addr0" in signals:
-            conn["mem"] = "mem"
-            for n in range(MAX_PORTS):
-                if n not in wr:
-                    continue
-                conn[f"clk{n}"]  = None
-                conn[f"csb{n}"]  = ~(wr[n] | rd[n])
-                conn[f"web{n}"]  = rd[n]
-                conn[f"din{n}"]  = wr_data[n]
-                conn[f"addr{n}"] = misc.cond(wr[n], wr_addr[n], rd_addr[n])
-                conn[f"wsel{n}"] = wsel[n]
-                conn[f"dout{n}"] = None
+        if names is _OPENRAM_NAMES:
+            for n in wr:
+                keys = _PORT_KEYS[n]
+                conn.update({keys["csb"]: ~(wr[n] | rd[n]), keys["web"]: rd[n], keys["din"]: wr_data[n],
+                             keys["addr"]: misc.cond(wr[n], wr_addr[n], rd_addr[n]), keys["wsel"]: wsel[n]})
 
         # tsmc
-        elif "D" in signals and "Q" in signals:
-            conn["mem"] = "u_ram_core.memory"
-            if "AA" in signals and "CLKW" in signals: # one write port and one read port
-                conn["clk0"]  = None
-                conn["csb0"]  = None
-                conn["web0"]  = wr[0]
-                conn["addr0"] = wr_addr[0]
-                conn["din0"]  = wr_data[0]
-                conn["wsel0"] = wsel[0]
-                conn["dout0"] = None
-
-                conn["clk1"]  = None
-                conn["csb1"]  = None
-                conn["web1"]  = rd[1]
-                conn["addr1"] = rd_addr[1]
-                conn["din1"]  = None
-                conn["wsel1"] = None
-                conn["dout1"] = None
-            else: # one port for read and write
-                conn["clk0"]  = None
-                conn["csb0"]  = ~(wr[0] | rd[0])
-                conn["web0"]  = rd[0]
-                conn["addr0"] = misc.cond(wr[0], wr_addr[0], rd_addr[0])
-                conn["din0"]  = wr_data[0]
-                conn["wsel0"] = ~wsel[0]
-                conn["dout0"] = rd_data[0]
-
-                conn["clk1"]  = None
-                conn["csb1"]  = None
-                conn["web1"]  = None
-                conn["addr1"] = None
-                conn["din1"] = None
-                conn["wsel1"] = None
-                conn["dout1"] = None
-
-        else:
-            self._raise("failed to find sram port connectivity")
+        elif names is _TSMC_1W1R_NAMES: # one write port and one read port
+            conn.update({"web0": wr[0], "addr0": wr_addr[0], "din0": wr_data[0], "wsel0": wsel[0],
+                         "web1": rd[1], "addr1": rd_addr[1]})
+        else: # one port for read and write
+            conn.update({"csb0": ~(wr[0] | rd[0]), "web0": rd[0], "addr0": misc.cond(wr[0], wr_addr[0], rd_addr[0]),
+                         "din0": wr_data[0], "wsel0": ~wsel[0], "dout0": rd_data[0]})
 
         return conn
         
+    def _get_ports(self, sram_name):
+        if sram_name not in _ports_cache:
+            signals = self._get_verilog_ports(sram_name)
+            _ports_cache[sram_name] = signals, self._get_lib_names(signals)
+        return _ports_cache[sram_name]
+
     def _check_port(self, sram_name, name):
-        signals = self._get_verilog_ports(sram_name)
-        names = self._get_lib_names(signals)
-        port_names = list(signals.keys())
-        return names[name] is not None and names[name] in port_names
+        if sram_name not in _present_cache:
+            signals, names = self._get_ports(sram_name)
+            _present_cache[sram_name] = {key: port is not None and port in signals for key, port in names.items()}
+        return _present_cache[sram_name][name]
 
 
     def get_params(self, sram_name):
@@ -342,27 +308,25 @@ class g_sram(p2v):
         Returns:
             dict
         """
-        if sram_name is None:
-            return {"port0":"w", "port1":"r","bit_sel":1}
+        if sram_name in _params_cache:
+            return _params_cache[sram_name]
         params = {}
         self._assert_type(sram_name, str)
         self.assert_static(self._find_module(sram_name) is not None, f"could not find sram {sram_name}")
-        signals = self._get_verilog_ports(sram_name)
-        names = self._get_lib_names(signals)
+        signals, names = self._get_ports(sram_name)
 
         params["bits"] = signals[names["din0"]]._bits
         params["addr_bits"] = signals[names["addr0"]]._bits
         params["line_num"] = 1 << params["addr_bits"]
-        port_names = list(signals.keys())
-        params["dual_clk"] = names["clk1"] in port_names
-        if names["wsel0"] in port_names:
+        params["dual_clk"] = self._check_port(sram_name, "clk1")
+        if self._check_port(sram_name, "wsel0"):
             params["bit_sel"] = params["bits"] // signals[names["wsel0"]]._bits
         else:
             params["bit_sel"] = 0
 
-        for n in range(MAX_PORTS):
-            params[f"port{n}"] = self.get_port_type(sram_name, idx=n)
+        params.update(self._get_port_types(sram_name))
 
+        _params_cache[sram_name] = params
         return params
 
     def get_port_type(self, sram_name, idx):
@@ -376,21 +340,21 @@ class g_sram(p2v):
         Returns:
             string ("w", "r" or "w/r")
         """
-        if sram_name is None:
-            params = self.get_params(sram_name)
-        else:
-            params = {}
-            for n in range(MAX_PORTS):
-                if self._check_port(sram_name, f"csb{n}") and self._check_port(sram_name, f"web{n}"):
-                    params[f"port{n}"] = "w/r"
-                elif self._check_port(sram_name, f"csb{n}") or self._check_port(sram_name, f"web{n}"):
-                    if self._check_port(sram_name, f"din{n}"):
-                        params[f"port{n}"] = "w"
-                    else:
-                        params[f"port{n}"] = "r"
+        return self.get_params(sram_name)[_PORT_KEYS[idx]["port"]]
+
+    def _get_port_types(self, sram_name):
+        params = {}
+        for keys in _PORT_KEYS:
+            if self._check_port(sram_name, keys["csb"]) and self._check_port(sram_name, keys["web"]):
+                params[keys["port"]] = "w/r"
+            elif self._check_port(sram_name, keys["csb"]) or self._check_port(sram_name, keys["web"]):
+                if self._check_port(sram_name, keys["din"]):
+                    params[keys["port"]] = "w"
                 else:
-                    params[f"port{n}"] = ""
-        return params[f"port{idx}"]
+                    params[keys["port"]] = "r"
+            else:
+                params[keys["port"]] = ""
+        return params
 
     def compare_srams(self, sram_name0, sram_name1, allow_diff=None):
         """
@@ -409,8 +373,10 @@ class g_sram(p2v):
         self._assert_type(sram_name0, str)
         self._assert_type(sram_name1, str)
         self._assert_type(allow_diff, list)
-        other_params = g_sram(self).get_params(sram_name1)
+        if sram_name0 == sram_name1: # an sram always matches itself
+            return
+        other_params = self.get_params(sram_name1)
         for name, value in self.get_params(sram_name0).items():
-            if name not in allow_diff:
-                self.assert_static(value == other_params[name], f"{sram_name0} uses ({name} = {value}) while {sram_name1} uses ({name} = {other_params[name]})")
+            if name not in allow_diff and value != other_params[name]:
+                self.assert_static(False, f"{sram_name0} uses ({name} = {value}) while {sram_name1} uses ({name} = {other_params[name]})")
 
@@ -22,13 +22,16 @@ from p2v import p2v
 
 import g_mem_top
 
+_MEMS = {
+         "main": {"bits": 64, "line_num": 4*1024, "sram_name": "sram_1rw1r0w_32_512_scn4m_subm", "sample_rd_out": True}, # main sram
+         "local": {"bits": 17, "line_num": 64}, # local sram - ff implementation
+        }
+
 class basic_mem(p2v):
     
     def module(self, project="carmel"):
 
 
-        # main sram
-        g_mem_top.g_mem_top(self).module(name=f"{project}_main", bits=64, line_num=4*1024, sram_name="sram_1rw1r0w_32_512_scn4m_subm", sample_rd_out=True)  
-        # local sram - ff implementation
-        g_mem_top.g_mem_top(self).module(name=f"{project}_local", bits=17, line_num=64)      
+        for suffix, args in _MEMS.items():
+            g_mem_top.g_mem_top(self).module(name=f"{project}_{suffix}", **args)
         